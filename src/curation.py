@@ -10,14 +10,18 @@ Functions & Classes
 -------------------
 geodlparse(acc, datadir='', silent=False, make_dir=False, cache=False)
     Download, parse and cache data from GEO.
-    This fuction only downloads GSE and GPL data.
+    This fuction only downloads GPL data; expression matrices come from
+    CuMiDa.
+gpltable(acc, datadir='', silent=False)
+    Load the probe annotation table for a GPL, cached as a Feather file.
 CuMiDa()
     Class for downloading gene expression matrices from GEO, parsing them and
     combining them with Ensembl gene IDs from the corresponding GPL.
 curate
     Download the datasets from CuMiDa and build the CaBiD database.
 datacheck()
-    Check if the CaBiD database exists and create it if it doesn't.
+    Check if the CaBiD database exists and is up to date, and (re)build it if
+    it isn't.
 
 __main__
 ---------
@@ -32,14 +36,19 @@ To locate the downloaded data, run the following command in a terminal:
 """
 
 # Import necessary modules
-from GEOparse.GEOTypes import GPL, GSE
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from GEOparse.GEOTypes import GPL
+from GEOparse.GEOparse import get_GEO_file
 from GEOparse import get_GEO
 from tqdm.auto import tqdm
 from pathlib import Path
 from typing import Union
 from rich import print
 
-import json, os, pickle, re, warnings
+import csv, gzip, json, os, warnings
+import pyarrow.feather as feather
+import pyarrow.csv as pv
+import pyarrow as pa
 import pandas as pd
 import numpy as np
 
@@ -47,6 +56,19 @@ import numpy as np
 import utils
 
 
+# In-process memoization of geodlparse results for cached accessions
+_GEO_MEMO = dict()
+
+# In-process memoization of gpltable results
+_GPL_MEMO = dict()
+
+# Format version of the on-disk GEO cache
+GEO_CACHE_VERSION = 1
+
+# Layout version of the CaBiD database (stored in PRAGMA user_version)
+DB_SCHEMA_VERSION = 1
+
+
 # Suppress DtypeWarning from GEOparse
 warnings.filterwarnings(
     action='ignore',
@@ -55,21 +77,122 @@ warnings.filterwarnings(
 )
 
 
+def _geo_meta_path(path: Path) -> Path:
+    """Path to the metadata file of a cached GEO object"""
+    return path.with_name(path.name + '.meta.json')
+
+
+def _dump_geo(obj: GPL, path: Path) -> None:
+    """
+    Cache a GEOparse object as a JSON metadata file and Parquet tables.
+
+    Parameters
+    ----------
+    obj : GPL
+        GEOparse object to cache
+    path : Path
+        Base path for the cache files
+    """
+
+    # The metadata file is written last and marks the cache as complete
+    with utils.atomicpath(path.with_name(path.name + '.table.parquet')) as tmp:
+        obj.table.to_parquet(tmp, compression='zstd')
+    with utils.atomicpath(path.with_name(path.name + '.columns.parquet')) as tmp:
+        obj.columns.to_parquet(tmp, compression='zstd')
+    with utils.atomicpath(_geo_meta_path(path)) as tmp, open(tmp, 'w') as f:
+        json.dump({
+            'version': GEO_CACHE_VERSION,
+            'type': type(obj).__name__,
+            'name': obj.name,
+            'metadata': obj.metadata
+        }, f)
+
+
+def _load_geo(path: Path) -> GPL:
+    """
+    Load a GEOparse object cached by `_dump_geo`.
+
+    Parameters
+    ----------
+    path : Path
+        Base path for the cache files
+
+    Returns
+    -------
+    GPL
+        Cached GEOparse object
+    """
+
+    with open(_geo_meta_path(path), 'r') as f:
+        meta = json.load(f)
+    if meta.get('version') != GEO_CACHE_VERSION or meta.get('type') != 'GPL':
+        raise ValueError(f'Incompatible cache for {path.name}')
+
+    return GPL(
+        name=meta['name'],
+        metadata=meta['metadata'],
+        table=pd.read_parquet(path.with_name(path.name + '.table.parquet')),
+        columns=pd.read_parquet(path.with_name(path.name + '.columns.parquet'))
+    )
+
+
+def _read_gpl_table(
+    path: str | Path,
+    usecols: tuple=('ID', 'GB_ACC')
+) -> pd.DataFrame:
+    """
+    Read selected columns of the platform table from a GPL SOFT file
+    without parsing the rest of the file.
+
+    Parameters
+    ----------
+    path : str | Path
+        Path to the SOFT file (optionally gzipped)
+    usecols : tuple, optional
+        Columns to keep, by default ('ID', 'GB_ACC')
+
+    Returns
+    -------
+    pd.DataFrame
+        Platform table
+    """
+
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'rt') as f:  # type: ignore
+        # Skip ahead to the start of the table
+        line = f.readline()
+        while line and not line.startswith('!platform_table_begin'):
+            line = f.readline()
+        if not line:
+            raise ValueError(f'No platform table found in {path}')
+
+        table = pd.read_csv(f, sep='\t', dtype=str,
+                            usecols=lambda x: x in usecols)
+
+    # Drop the end-of-table marker and anything after it
+    end = np.flatnonzero(table['ID'].str.startswith('!', na=False).to_numpy(bool))
+    if end.size:  table = table.iloc[:end[0]]
+
+    return table
+
+
 def geodlparse(
     acc: str, 
     datadir: str | Path='', 
     silent: bool=False,
     make_dir: bool=False,
-    cache: bool=False
-) -> GSE | GPL:  #type: ignore
+    cache: bool=False,
+    table_only: bool=False
+) -> GPL | pd.DataFrame:  #type: ignore
     """
     Download, parse and cache data from GEO.
-    This fuction only downloads GSE and GPL data.
+    This fuction only downloads GPL data; expression matrices come from
+    CuMiDa.
 
     Parameters
     ----------
     acc : str
-        GEO accession
+        GPL accession
     datadir : str | Path, optional
         Directory for storing downloaded data, will default to a 
         temporary directory if not specified
@@ -80,18 +203,20 @@ def geodlparse(
         by default False
     cache : bool, optional
         Whether to cache the data, by default False
+    table_only : bool, optional
+        Only read the ID and GB_ACC columns of the platform
+        table instead of parsing the full SOFT file, by default False
 
     Returns
     -------
-    GPL | GSE
-        Parsed GEO data
+    GPL | pd.DataFrame
+        Parsed GEO data, or the platform table if `table_only` is set
     """
 
     # Check inputs
-    acc = acc.upper()
     assert isinstance(acc, str), 'acc must be a string'
-    assert acc.startswith('GSE') or acc.startswith('GPL'), \
-        'acc must be a GSE or GPL accession'
+    acc = acc.upper()
+    assert acc.startswith('GPL'), 'acc must be a GPL accession'
 
     assert isinstance(datadir, str) or isinstance(datadir, Path),\
         "datadir must be a string or pathlib.Path object"
@@ -107,18 +232,45 @@ def geodlparse(
     assert isinstance(silent, bool), 'silent must be a boolean'
     assert isinstance(make_dir, bool), 'make_dir must be a boolean'
     
+    # Repeated cached calls are served from memory
+    if not cache:
+        return _geodlparse(acc, datadir, silent, cache, table_only)
+
+    key = (acc, str(datadir), table_only)
+    if key not in _GEO_MEMO:
+        geodata = _geodlparse(acc, datadir, silent, cache, table_only)
+        if geodata is None:  return None  # Don't memoize failures
+        _GEO_MEMO[key] = geodata
+    return _GEO_MEMO[key]
+
+
+def _geodlparse(
+    acc: str,
+    datadir: Path,
+    silent: bool,
+    cache: bool,
+    table_only: bool
+) -> GPL | pd.DataFrame:  #type: ignore
+    """
+    Implementation of geodlparse, called after inputs have been checked.
+    """
+
     # Define file names
-    geofile = datadir.joinpath(
-        f'{acc}.txt' if acc[:3] == 'GPL' else f'{acc}_family.soft.gz'
-    ).resolve()
-    cachefile = utils.cachedir().joinpath(f'{acc}.cache').resolve()
+    geofile = datadir.joinpath(f'{acc}.txt')
+    cachefile = utils.cachedir().joinpath(acc)
+
+    # Read only the platform table
+    if table_only:
+        if not os.path.isfile(geofile):
+            if not silent:  print(f"Downloading {acc}")
+            geofile = get_GEO_file(acc, destdir=str(datadir), silent=silent)[0]
+        return _read_gpl_table(geofile)
 
     # Load cached data if it exists
-    if cachefile.is_file():
+    if _geo_meta_path(cachefile).is_file():
         try:
             if not silent: print(f'Loading cached data for {acc}')
-            with open(cachefile, 'rb') as f:
-                return pickle.load(f)
+            return _load_geo(cachefile)
         except Exception as E:
             print(f"[bold red]Error loading cached data[/bold red]",
                   f"\n\n{E}", sep=' ')
@@ -129,7 +281,7 @@ def geodlparse(
             # Parse already downloaded data
             if os.path.isfile(geofile):
                 if not silent:  print(f"Parsing {acc}")
-                geodata = get_GEO(filepath=geofile.__str__(), silent=silent)
+                geodata = get_GEO(filepath=str(geofile), silent=silent)
 
             # Download and parse data
             else:
@@ -138,8 +290,7 @@ def geodlparse(
             
             # Cache data
             if cache:
-                with open(cachefile, 'wb') as handle:
-                    pickle.dump(geodata, file=handle)
+                _dump_geo(geodata, cachefile)
             
             return geodata  #type: ignore
 
@@ -152,6 +303,56 @@ def geodlparse(
                 f"\n\n{E}", sep=' ')
 
 
+def gpltable(
+    acc: str,
+    datadir: str | Path='',
+    silent: bool=False
+) -> pd.DataFrame:
+    """
+    Load the probe annotation table (ID and GB_ACC columns) for a GPL.
+    The slim table is cached as a Feather file so that subsequent loads
+    skip reading the SOFT file.
+
+    Parameters
+    ----------
+    acc : str
+        GPL accession
+    datadir : str | Path, optional
+        Directory for storing downloaded data, passed on to geodlparse
+    silent : bool, optional
+        Whether to suppress output, by default False
+
+    Returns
+    -------
+    pd.DataFrame
+        GPL annotation table
+    """
+
+    # Check inputs
+    acc = acc.upper()
+    assert acc.startswith('GPL'), 'acc must be a GPL accession'
+
+    # Tables already loaded in this process are served from memory
+    if acc in _GPL_MEMO:
+        return _GPL_MEMO[acc]
+
+    # Load cached table if it exists
+    cachefile = utils.cachedir().joinpath(f'{acc}.feather')
+    if cachefile.is_file():
+        if not silent: print(f'Loading cached table for {acc}')
+        table = pd.read_feather(cachefile)
+
+    # Read only the columns needed for annotation
+    else:
+        table = (geodlparse(acc, datadir, silent=silent, table_only=True)
+            .reset_index(drop=True))  # type: ignore
+        with utils.atomicpath(cachefile) as tmp:
+            table.to_feather(tmp, compression='zstd')
+
+    _GPL_MEMO[acc] = table
+    return table
+
+
 class CuMiDa:
     """
     Class for loading datasets from the Curated Microarray Database 
@@ -164,6 +365,8 @@ class CuMiDa:
         database.
     BASEURL : str
         Base URL for downloading datasets from CuMiDa.
+    MAX_WORKERS : int
+        Number of threads used for concurrent downloads.
     index : pd.DataFrame
         Index of all datasets available from CuMiDa.
     datadir : str | Path
@@ -186,6 +389,11 @@ class CuMiDa:
              '3d11266abdd3c237d359dd7c11a40871/raw/'
              'ff2af81ae70afaba99233400f9d79e30eb40942e/cumida.json')
     BASEURL = 'https://sbcb.inf.ufrgs.br'
+    MAX_WORKERS = 8
+
+    __slots__ = ('datadir', 'gse_dir', 'gpl_dir', 'index', 'file_paths',
+                 '_downloads', '_selected', '_gpls', '_gpl_accs', '_gpl_maps',
+                 '_gse_files', '_session')
 
 
     def __init__(self, datadir: Union[str, Path]='') -> None:
@@ -204,17 +412,29 @@ class CuMiDa:
             'datapath must be a string or PosixPath'
         if datadir == '': datadir = utils.datadir()
         if isinstance(datadir, str): datadir = Path(datadir)
-        if not os.path.exists: os.makedirs(datadir);
+        os.makedirs(datadir, exist_ok=True)
         self.datadir = datadir.resolve()
 
+        # Share connections to the CuMiDa server across downloads
+        self._session = utils.httpsession()
+
         # Retrieve the index of datasets
         self._makeindex();
 
+        # Lookup tables for renaming probes, populated by download()
+        self._gpl_maps = dict()
+
         # Create subdirectory for gene expression matrices and platforms
         self.gse_dir = self.datadir / 'GSE'
         self.gpl_dir = self.datadir / 'GPL'
-        if not os.path.exists(self.gse_dir): os.makedirs(self.gse_dir)
-        if not os.path.exists(self.gpl_dir): os.makedirs(self.gpl_dir)
+        os.makedirs(self.gse_dir, exist_ok=True)
+        os.makedirs(self.gpl_dir, exist_ok=True)
+
+        # Record GSE matrices that have already been downloaded
+        with os.scandir(self.gse_dir) as it:
+            self._gse_files = {
+                x.name for x in it if x.is_file() and x.stat().st_size > 0
+            }
 
 
     def _makeindex(self) -> None:
@@ -223,27 +443,39 @@ class CuMiDa:
         available from CuMiDa.
         """
 
+        # Reuse the cleaned-up index from a previous run
+        cachefile = self.datadir / 'index.parquet'
+        if utils.isnonemptyfile(cachefile):
+            self.index = pd.read_parquet(cachefile)
+            self._downloads = self.index['URL'].to_dict()
+            return
+
         # Download the index
-        file = (self.datadir / 'datasets.json').resolve().__str__()
-        index = utils.downloadurl(self.INDEX, file, progress=False)
+        file = str(self.datadir / 'datasets.json')
+        utils.downloadurl(self.INDEX, file, progress=False,
+                          session=self._session)
 
         # Load the dataset index
-        with open(self.datadir / 'datasets.json', 'rb') as f:
-            self.index = pd.DataFrame(json.load(f))
-
-        # Clean up the columns
-        self.index['ID'] = 'GSE' + self.index['gse'].astype(str)
-        self.index['Platform'] = 'GPL' + self.index['platform'].astype(str)
-        self.index['URL'] = self.BASEURL + \
-            self.index['downloads'].apply(pd.Series)['csv']
-        self.index = (self.index
-            .rename(columns={'type': 'Type', 'classes': 'Classes', 
-                             'samples': 'Samples', 'genes': 'Genes',
-                             'manufacturer': 'Manufacturer'})
-            [['ID', 'Platform', 'Manufacturer', 'Type', 'Classes', 'Samples', 
-              'Genes', 'URL']]
+        with open(file, 'rb') as f:
+            records = json.load(f)
+        if isinstance(records, dict):  # Column-oriented JSON
+            records = pd.DataFrame(records).to_dict('records')
+
+        # Build the cleaned-up index in a single pass
+        rows = [
+            (f"GSE{r['gse']}", f"GPL{r['platform']}", r['manufacturer'],
+             r['type'], r['classes'], r['samples'], r['genes'],
+             self.BASEURL + r['downloads']['csv'])
+            for r in records
+        ]
+        self.index = (pd.DataFrame(rows, columns=[
+                'ID', 'Platform', 'Manufacturer', 'Type', 'Classes', 
+                'Samples', 'Genes', 'URL'
+            ])
             .sort_values(by=['Platform', 'Type'])
             .set_index(['ID', 'Type']))
+        with utils.atomicpath(cachefile) as tmp:
+            self.index.to_parquet(tmp, compression='zstd')
         self._downloads = self.index['URL'].to_dict()
 
 
@@ -278,27 +510,65 @@ class CuMiDa:
             raise KeyError('Dataset not found in CuMiDa index')
 
         # Download the GSE matrices from CuMiDa
-        self.file_paths = [
-            self.gse_dir / re.search(r'\w+\.csv', x)[0] for x in urls  #type: ignore
+        self.file_paths = [self.gse_dir / x.rsplit('/', 1)[-1] for x in urls]
+        pending = [
+            (url, file) for url, file in zip(urls, self.file_paths)
+            if file.name not in self._gse_files
         ]
-        if len(self.file_paths) > 1:
-            with tqdm(total=len(urls), desc='Downloading GSEs') as pbar:
-                for url, file in zip(urls, self.file_paths):
-                    utils.downloadurl(url, file.__str__(), progress=False);
+        if len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as ex, \
+                 tqdm(total=len(pending), desc='Downloading GSEs') as pbar:
+                futures = [
+                    ex.submit(self._fetch, url, file) for url, file in pending
+                ]
+                for future in as_completed(futures):
+                    future.result()
                     pbar.update(1)
-        else:
-            utils.downloadurl(urls[0], self.file_paths[0].__str__(), progress=False);
+        elif pending:
+            self._fetch(*pending[0]);
+        self._gse_files.update(file.name for _, file in pending)
 
         # Download the GPLs from GEO
-        self._gpl_accs = np.unique([
-            self.index.loc[x]['Platform'] for x in self._selected
-        ])
+        self._gpl_accs = sorted(set(
+            self.index.loc[self._selected, 'Platform']
+        ))
         self._gpls = dict()
-        with tqdm(total=len(self._gpl_accs), desc='Downloading GPLs') as pbar:
-            for acc in self._gpl_accs:
-                self._gpls[acc] = geodlparse(acc, self.gpl_dir.__str__(), silent=True)
+        gpl_dir = str(self.gpl_dir)
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as ex, \
+             tqdm(total=len(self._gpl_accs), desc='Downloading GPLs') as pbar:
+            futures = {
+                ex.submit(gpltable, acc, gpl_dir, silent=True): acc
+                for acc in self._gpl_accs
+            }
+            for future in as_completed(futures):
+                self._gpls[futures[future]] = future.result()
                 pbar.update(1)
 
+        # Build probe ID -> GenBank ID lookups once per GPL
+        for acc, gpl in self._gpls.items():
+            if 'GB_ACC' in gpl.columns:
+                ids = gpl['ID'].astype(str)
+                self._gpl_maps[acc] = dict(zip(
+                    ids, gpl['GB_ACC'].fillna(ids).astype(str)
+                ))
+
+
+    def _fetch(self, url: str, file: Path) -> None:
+        """
+        Download a GSE matrix and keep a Feather copy for fast loading.
+
+        Parameters
+        ----------
+        url : str
+            URL of the CSV file
+        file : Path
+            Destination of the CSV file
+        """
+
+        utils.downloadurl(url, str(file), progress=False,
+                          session=self._session)
+        self._to_feather(file)
+
 
     def load(self, dataset: tuple) -> pd.DataFrame:
         """
@@ -319,31 +589,101 @@ class CuMiDa:
         assert len(dataset) == 2, 'dataset must be a tuple of (ID, Type)'
         assert dataset in self.index.index, 'dataset not found in CuMiDa index'
 
-        # Load the GSE
+        # Load the GSE (CSVs without a Feather copy are converted first)
         path = self.gse_dir / f"{'_'.join(dataset[::-1])}.csv"
-        gse = pd.read_csv(path).set_index(['samples', 'type'])
+        platform = self.index.loc[dataset]['Platform']
+        if not path.with_suffix('.feather').is_file():
+            self._to_feather(path)
+        gse = (pd.read_feather(path.with_suffix('.feather'), use_threads=True)
+            .set_index(['samples', 'type']))
 
-        try:
+        if platform in self._gpl_maps:
             # Rename GSE columns with GenBank IDs where possible
-            gpl = self._gpls[self.index.loc[dataset]['Platform']].table
-            gpl['GB_ACC'] = gpl['GB_ACC'].fillna(gpl['ID'])
-            gse.columns = gse.columns.map(gpl.set_index('ID')['GB_ACC'])
-
-            # Add numeric suffices to duplicate column names
-            idx = (gse.columns.to_series()
-                .groupby(level=0)
-                .transform('cumcount'))
-            gse.columns = gse.columns + '.' + idx.astype(str)
+            gse.columns = self._rename(gse.columns, self._gpl_maps[platform])
 
             # Sort columns alphabetically
             gse = gse.reindex(sorted(gse.columns), axis=1)
-        except KeyError as E:
+        else:
             print(f'No GenBank IDs found for {dataset[0]}')
-            print(E)
 
         return gse
 
 
+    @staticmethod
+    def _read_table(path: Path) -> pa.Table:
+        """
+        Read a CuMiDa CSV into an Arrow table with float32 expression columns.
+
+        Parameters
+        ----------
+        path : Path
+            Path to the CSV file
+
+        Returns
+        -------
+        pa.Table
+        """
+
+        # Read the header to fix the column types
+        with open(path, newline='') as f:
+            header = next(csv.reader(f))
+        types = {x: pa.float32() for x in header}
+        types.update(samples=pa.string(), type=pa.string())
+
+        return pv.read_csv(path, convert_options=pv.ConvertOptions(
+            column_types=types
+        ))
+
+
+    @staticmethod
+    def _to_feather(path: Path) -> None:
+        """
+        Convert a downloaded CuMiDa CSV to a Feather file next to it.
+
+        Parameters
+        ----------
+        path : Path
+            Path to the CSV file
+        """
+
+        with utils.atomicpath(path.with_suffix('.feather')) as tmp:
+            feather.write_feather(
+                CuMiDa._read_table(path), tmp, compression='zstd'
+            )
+
+
+    @staticmethod
+    def _rename(columns: pd.Index, gbmap: dict) -> pd.Index:
+        """
+        Rename probe IDs with GenBank IDs and add numeric suffices to
+        duplicate names.
+
+        Parameters
+        ----------
+        columns : pd.Index
+            Probe IDs
+        gbmap : dict
+            Mapping of probe IDs to GenBank IDs
+
+        Returns
+        -------
+        pd.Index
+            Renamed columns
+        """
+
+        columns = [gbmap.get(x, x) for x in columns]
+
+        # Rank each name within its group of duplicates
+        codes = pd.factorize(np.asarray(columns, dtype=object))[0]
+        counts = np.bincount(codes)
+        order = np.argsort(codes, kind='stable')
+        idx = np.empty_like(order)
+        idx[order] = (np.arange(order.size) 
+                      - np.repeat(np.cumsum(counts) - counts, counts))
+
+        return pd.Index(columns) + '.' + idx.astype(str)
+
+
     def __repr__(self) -> str:
         """Return a string representation of the CuMiDa class"""
 
@@ -374,46 +714,95 @@ def curate() -> None:
     # Drop any existing tables
     db.drop_table('datasets')
     db.drop_table('expression')
+    db.drop_table('dge_cache')
 
     # Create the tables
     db.execute("""
     CREATE TABLE IF NOT EXISTS `datasets` (
         `ID` INTEGER PRIMARY KEY AUTOINCREMENT,
         `GSE` VARCHAR(8) NOT NULL,
-        `CANCER` VARCHAR(10) NOT NULL
+        `CANCER` VARCHAR(10) NOT NULL,
+        `GENES` TEXT NOT NULL
     );
     """)
     db.execute("""
     CREATE TABLE IF NOT EXISTS `expression` (
-        `ID` INTEGER PRIMARY KEY AUTOINCREMENT,
-        `DATASET_ID` INT NOT NULL,
-        `SAMPLE_TYPE` VARCHAR(32) NOT NULL,
-        `EXPRESSION` BLOB NOT NULL,
+        `DATASET_ID` INTEGER PRIMARY KEY,
+        `N_SAMPLES` INT NOT NULL,
+        `N_GENES` INT NOT NULL,
+        `SAMPLE_TYPES` TEXT NOT NULL,
+        `MATRIX` BLOB NOT NULL,
         FOREIGN KEY(`DATASET_ID`) REFERENCES `datasets`(`ID`)
     );
     """)
+    ## DGE results persisted across sessions by the GUI
+    db.execute("""
+    CREATE TABLE IF NOT EXISTS `dge_cache` (
+        `GSE` VARCHAR(8) NOT NULL,
+        `CANCER` VARCHAR(10) NOT NULL,
+        `P_THR` REAL NOT NULL,
+        `FC_THR` REAL NOT NULL,
+        `RESULTS` BLOB NOT NULL,
+        PRIMARY KEY (`GSE`, `CANCER`, `P_THR`, `FC_THR`)
+    );
+    """)
 
-    # Populate the database with the selected datasets
-    with tqdm(total=len(selected), desc="Building Database") as pbar:
-        for i, gse_idx in enumerate(selected, start=1):
-            # Populate the `datasets` table
-            db.execute("""
-            INSERT INTO `datasets` (`GSE`, `CANCER`) VALUES (?, ?);
-            """, gse_idx)
+    # Skip journaling and fsyncs while bulk loading
+    db.conn.executescript("""
+    PRAGMA journal_mode=MEMORY;
+    PRAGMA synchronous=OFF;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-262144;
+    """)
 
-            # Load the GSE matrix
-            gse = cumida.load(gse_idx)
+    def prepare(gse_idx: tuple) -> tuple:
+        """Load a GSE matrix and encode it for the database"""
+        gse = cumida.load(gse_idx)
+        return (
+            '\t'.join(gse.columns), gse.shape,
+            '\t'.join(gse.index.get_level_values('type')),
+            db.binarize(gse.to_numpy(dtype='<f4'))
+        )
+
+    # Populate the database with the selected datasets (single transaction)
+    ## Matrices are loaded and compressed on worker threads; inserts stay on
+    ## this thread, which owns the sqlite connection
+    with ThreadPoolExecutor(max_workers=CuMiDa.MAX_WORKERS) as ex, \
+         tqdm(total=len(selected), desc="Building Database") as pbar:
+        results = ex.map(prepare, selected)
+        for i, (gse_idx, (genes, shape, types, matrix)) in enumerate(
+            zip(selected, results), start=1
+        ):
+            # Populate the `datasets` table (gene IDs are tab-separated)
+            db.execute("""
+            INSERT INTO `datasets` (`GSE`, `CANCER`, `GENES`) VALUES (?, ?, ?);
+            """, (*gse_idx, genes), commit=False)
 
             # Populate the `expression` table
-            samples = (gse.apply(lambda row: db.binarize(row), axis=1)
-                .to_frame()
-                .reset_index()
-                .drop(columns='samples')
-                .rename(columns={'type': 'SAMPLE_TYPE', 0: 'EXPRESSION'}))
-            samples['DATASET_ID'] = i
-            samples.to_sql('expression', db.conn, if_exists='append', index=False)
+            ## Store the whole (samples x genes) matrix as one float32 BLOB
+            db.execute("""
+            INSERT INTO `expression` 
+                (`DATASET_ID`, `N_SAMPLES`, `N_GENES`, `SAMPLE_TYPES`, `MATRIX`)
+            VALUES (?, ?, ?, ?, ?);
+            """, (i, *shape, types, matrix), commit=False)
 
             pbar.update(1)
+    db.conn.commit()
+
+    # Index the dataset lookups used by the GUI (built after the bulk load)
+    db.conn.executescript("""
+    CREATE INDEX IF NOT EXISTS `ix_datasets_cancer` ON `datasets` (`CANCER`);
+    CREATE INDEX IF NOT EXISTS `ix_datasets_gse_cancer`
+        ON `datasets` (`GSE`, `CANCER`);
+    ANALYZE;
+    """)
+    db.conn.execute(f'PRAGMA user_version={DB_SCHEMA_VERSION}')
+
+    # Restore the default journaling settings
+    db.conn.executescript("""
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    """)
 
     # Close the database connection
     db.close()
@@ -422,14 +811,22 @@ def curate() -> None:
 def datacheck() -> None:
     """
     Check if the CaBiD database exists and create it if it doesn't.
+    Databases with an older table layout (user_version != DB_SCHEMA_VERSION)
+    are rebuilt.
     """
     dbpath = utils.datadir() / 'CaBiD.db'
     if not dbpath.exists():
         curate();
-    else:
-        with utils.CaBiD_db(dbpath) as db:
-            if not (db.check_table('expression') and db.check_table('datasets')):
-                curate();
+        return
+
+    # Close the connection before rebuilding; curate() switches the journal
+    # mode, which SQLite refuses while another connection is open
+    ## Databases built with an older table layout are rebuilt too
+    with utils.CaBiD_db(dbpath) as db:
+        complete = db.check_table('expression') and db.check_table('datasets')
+        version = db.conn.execute('PRAGMA user_version').fetchone()[0]
+    if not complete or version != DB_SCHEMA_VERSION:
+        curate();
 
 
 if __name__ == '__main__':
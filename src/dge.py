@@ -13,6 +13,8 @@ sort_normal
     Sort a pandas series so that normal samples are first
 dge
     Perform differential gene expression analysis on a GSE dataset
+warmup
+    Pre-load the libraries used by the analysis and plots
 plot_volcano
     Create a volcano plot
 plot_heatmap
@@ -20,27 +22,70 @@ plot_heatmap
 """
 
 # Import modules
-from matplotlib import colors, gridspec, patches, pyplot as plt
-from statsmodels.stats import multitest
-from scipy.cluster import hierarchy
-from scipy.spatial import distance
 from scipy import stats
 
-import seaborn as sns
 import pandas as pd
 import numpy as np
-import re
+import importlib, re
+
+
+# Matches normal sample types
+_NORMAL_RE = re.compile(r'normal', re.IGNORECASE)
+
+
+def _is_normal(labels) -> np.ndarray:
+    """Boolean mask of the sample labels that are normal (case-insensitive)"""
+
+    labels = np.asarray(labels, dtype=str)
+    return np.fromiter(
+        (_NORMAL_RE.search(x) is not None for x in labels),
+        dtype=bool, count=labels.size
+    )
 
 
 def sort_normal(X: pd.Series):
     """Sort a Series so that normal samples are first"""
 
-    def sorter(rgx: str, txt: str) -> str:
-        """Sorting key for sorting a list of strings by a regex match"""
-        r = re.search(rgx, txt)
-        return r.group(0) if r else '{'
+    # '{' sorts after 'normal', so non-normal samples come last
+    return pd.Index(np.where(_is_normal(X), 'normal', '{'))
+
+
+def _welch(Xn: np.ndarray, Xt: np.ndarray) -> tuple:
+    """
+    Per-gene Welch's t statistics for two sample groups. The gene-length
+    buffers (means, variances, standard errors) are reused in place; the
+    variance computation still allocates a samples x genes temporary.
+
+    Parameters
+    ----------
+    Xn, Xt : np.ndarray
+        Samples x genes matrices for the normal and tumor groups
+
+    Returns
+    -------
+    fc, t, df : np.ndarray
+        Mean differences, t statistics and degrees of freedom
+    """
+
+    n1, n2 = Xn.shape[0], Xt.shape[0]
+
+    # Group means and squared standard errors
+    m1, m2 = Xn.mean(axis=0), Xt.mean(axis=0)
+    s1 = Xn.var(axis=0, ddof=1, out=np.empty_like(m1)); s1 /= n1
+    s2 = Xt.var(axis=0, ddof=1, out=np.empty_like(m2)); s2 /= n2
+
+    # Fold change (subtract because log transformed) and t statistic
+    fc = np.subtract(m1, m2, out=m1)
+    se2 = s1 + s2
+    t = fc / np.sqrt(se2)
 
-    return pd.Index([sorter('normal', x) for x in X])
+    # Welch-Satterthwaite degrees of freedom
+    np.square(s1, out=s1); s1 /= n1 - 1
+    np.square(s2, out=s2); s2 /= n2 - 1
+    s1 += s2
+    df = np.square(se2, out=se2); df /= s1
+
+    return fc, t, df
 
 
 def dge(gse: pd.DataFrame, fc_thr: float=2.0, p_thr: float=0.05):
@@ -59,42 +104,63 @@ def dge(gse: pd.DataFrame, fc_thr: float=2.0, p_thr: float=0.05):
         A p-value threshold for differentially expressed genes, by default 0.05
     """
 
-    # Compute fold changes and p-values
-    dge = (gse.groupby('SAMPLE_TYPE').mean()
-        .sort_index(key=sort_normal))
-    fc = dge.iloc[0,:] - dge.iloc[1,:]  # Subtract because log transformed
-    pvals = stats.ttest_ind(
-        gse.filter(regex='normal', axis=0),
-        gse.filter(regex='^((?!normal).)*$', axis=0),
-        equal_var=False
-    )
+    # Split samples into normal and tumor groups
+    is_normal = _is_normal(gse.index.get_level_values('SAMPLE_TYPE'))
+    X = gse.to_numpy(dtype=np.float64)
+    Xn, Xt = X[is_normal], X[~is_normal]
+
+    # Compute fold changes and Welch's t-test p-values
+    fc, t, df = _welch(Xn, Xt)
+    pvals = 2 * stats.t.sf(np.abs(t), df)
 
-    # P-value correction
-    adj_pvals = multitest.fdrcorrection(pvals.pvalue)[1]
+    # P-value correction (Benjamini-Hochberg)
+    order = np.argsort(pvals)
+    ranked = pvals[order] * pvals.size / np.arange(1, pvals.size + 1)
+    adj_pvals = np.empty_like(ranked)
+    adj_pvals[order] = np.minimum.accumulate(ranked[::-1])[::-1].clip(max=1.0)
 
     # Create dge table
-    dge = (pd.DataFrame({
+    dge = pd.DataFrame({
+        'gene': gse.columns,
         'fc': fc,
-        'pval': pvals.pvalue,
+        'pval': pvals,
         'adj pval': adj_pvals,
         '-log10(adj pval)': -np.log10(adj_pvals),
-        'de': (adj_pvals < p_thr) & (abs(fc) > fc_thr)
-    }).reset_index()
-        .rename(columns={'index': 'gene'}))
-    dge['de'] = dge['de'].replace({True: 'Significant', False: 'Non Significant'})
+        'de': np.where((adj_pvals < p_thr) & (np.abs(fc) > fc_thr),
+                       'Significant', 'Non Significant')
+    })
 
     return dge
 
 
+def warmup() -> None:
+    """
+    Import the plotting libraries and run `dge` on a tiny dataset so the
+    first real analysis doesn't pay for them.
+    """
+
+    # Imported only for the side effect of loading them into sys.modules
+    for module in ('scipy.cluster.hierarchy', 'scipy.spatial.distance',
+                   'seaborn'):
+        importlib.import_module(module)
+
+    index = pd.Index(['normal', 'normal', 'tumor', 'tumor'], name='SAMPLE_TYPE')
+    dge(pd.DataFrame(np.random.rand(4, 3), index=index))
+
+
 def plot_volcano(ax, dge, fc_thr: float=2.0, p_thr: float=0.05):
     """
     Create a volcano plot
     """
 
+    # Plotting libraries are only imported when needed
+    import seaborn as sns
+
     ax.clear()
     sns.scatterplot(
         data=dge, x='fc', y='-log10(adj pval)', hue='de',
-        ax=ax, s=20, alpha=0.5, palette=['#999999', '#ff0000']
+        ax=ax, s=20, alpha=0.5, palette=['#999999', '#ff0000'],
+        rasterized=len(dge) > 5000
     )
     ax.axhline(-np.log10(p_thr), color='#999999', linestyle='--')
     ax.axvline(fc_thr, color='#999999', linestyle='--')
@@ -109,58 +175,65 @@ def plot_volcano(ax, dge, fc_thr: float=2.0, p_thr: float=0.05):
     ax.spines['top'].set_visible(False)
 
 
-def plot_heatmap(fig, axes, data):
+def plot_heatmap(fig, axes, data, clusters: dict | None=None):
     """
-    Create a heatmap of all genes
+    Create a heatmap of all genes on the axes returned by
+    `GUIPanel.create_figure` (samp_dendro, gene_dendro, anot, hmap, cbar).
+    If `clusters` is given, the selected genes and linkages are stored in it
+    and reused when the same dict is passed again for the same data.
     """
 
-    # Clear figure
-    fig.clf()
+    # Plotting libraries are only imported when needed
+    from matplotlib import colors, patches, pyplot as plt
+    from scipy.cluster import hierarchy
+    from scipy.spatial import distance
 
-    # Create grid spec
-    gs = gridspec.GridSpec(
-        2, 4, width_ratios=[0.1, 0.04, 1, 0.02], height_ratios=[0.25, 1],
-        wspace=0.02, hspace=0.02
-    )
+    # Clear the axes created by the caller instead of rebuilding the figure
+    for axis in axes.values():
+        axis.cla()
 
-    # Define axes
-    axes = dict(
-        samp_dendro=fig.add_subplot(gs[1, 0]),
-        gene_dendro=fig.add_subplot(gs[0, 2]),
-        anot=fig.add_subplot(gs[1, 1]),
-        hmap=fig.add_subplot(gs[1, 2]),
-        cbar=fig.add_subplot(gs[1, 3]),
-    )
+    if clusters is None:  clusters = dict()
 
     # Filter out genes by variance (keep the 99th percentile)
-    data = data.loc[:, data.var() > data.var().quantile(0.99)]
+    if 'columns' not in clusters:
+        v = data.to_numpy().var(axis=0, ddof=1)
+        clusters['columns'] = np.flatnonzero(v > np.quantile(v, 0.99))
+    data = data.iloc[:, clusters['columns']]
     
     # Get values
-    X = data.values
+    X = np.ascontiguousarray(data.to_numpy(dtype=np.float32))  # samples x genes
+
+    # Cluster samples and genes
+    if 'samples' not in clusters:
+        XT = np.ascontiguousarray(X.T)  # genes x samples
+        clusters['samples'] = hierarchy.linkage(distance.pdist(X), 
+                                                method='average')
+        clusters['genes'] = hierarchy.linkage(distance.pdist(XT), 
+                                              method='average')
 
-    # Cluster samples and plot dendrogram
-    Y = hierarchy.linkage(X)
+    # Plot sample dendrogram
     with plt.rc_context({'lines.linewidth': 0.8}):
-        Z1 = hierarchy.dendrogram(Y, orientation='left', ax=axes['samp_dendro'])
+        Z1 = hierarchy.dendrogram(clusters['samples'], orientation='left', 
+                                  ax=axes['samp_dendro'])
     axes['samp_dendro'].set_xticks([])
     axes['samp_dendro'].set_yticks([])
     for x in ['top', 'bottom', 'left', 'right']:
         axes['samp_dendro'].spines[x].set_visible(False)
 
-    # Cluster genes and plot dendrogram
-    Y = hierarchy.linkage(X.T)
+    # Plot gene dendrogram
     with plt.rc_context({'lines.linewidth': 0.4}):
-        Z2 = hierarchy.dendrogram(Y, orientation='top', ax=axes['gene_dendro'])
+        Z2 = hierarchy.dendrogram(clusters['genes'], orientation='top', 
+                                  ax=axes['gene_dendro'])
     axes['gene_dendro'].set_xticks([])
     axes['gene_dendro'].set_yticks([])
 
     # Reorder data
-    X = X[Z1['leaves'], :][:, Z2['leaves']]
+    X = X[np.ix_(Z1['leaves'], Z2['leaves'])]
     xlab = data.index.values[Z1['leaves']]
 
     # Annotation bar
     ## Create matrix for annotation bar
-    annot = np.matrix([1 if re.search(r'normal', lab) else 0 for lab in xlab]).T
+    annot = _is_normal(xlab).astype(np.uint8).reshape(-1, 1)
     ## Create color map
     cmap = colors.ListedColormap(['#33c442', '#c43333'])  # type: ignore
     norm = colors.BoundaryNorm([0, 0.5, 1], cmap.N)  # type: ignore
@@ -168,12 +241,12 @@ def plot_heatmap(fig, axes, data):
     axes['anot'].imshow(annot, aspect='auto', cmap=cmap, norm=norm)
 
     # Plot the heatmap
-    sns.heatmap(X, cmap='YlOrBr_r', ax=axes['hmap'], cbar=False)
+    image = axes['hmap'].imshow(
+        X, aspect='auto', cmap='YlOrBr_r', interpolation='nearest'
+    )
 
     # Add a colorbar
-    axes.update({
-        'cbar': fig.colorbar(axes['hmap'].collections[0], cax=axes['cbar'])
-    })
+    fig.colorbar(image, cax=axes['cbar'])
 
     # Despine axes and remove ticks
     for axis in axes.values():
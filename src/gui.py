@@ -25,12 +25,21 @@ expression analysis on the dataset.
 # Import modules
 from matplotlib.backends.backend_wxagg import FigureCanvasWxAgg as FigureCanvas
 from matplotlib.figure import Figure
-from matplotlib import gridspec
+from collections import OrderedDict
 from pathlib import Path
+import matplotlib as mpl
+import numpy as np
+import threading
 import wx
 
+# Simplify paths and chunk large draws to reduce Agg rendering work
+mpl.rcParams.update({
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000
+})
+
 # Import CaBiD modules
-from dge import dge, plot_volcano, plot_heatmap
 from utils import datadir, CaBiD_db
 from curation import datacheck
 
@@ -58,8 +67,11 @@ class ControlBox(wx.StaticBox):
             self.label.SetFont(font)
             self.Add(self.label, 1, wx.RIGHT)
 
-            # Create text input
-            self.field = wx.TextCtrl(parent, size=(60,20), style=wx.TE_PROCESS_ENTER)
+            # Create text input (only numerals and decimal points are accepted)
+            validator = wx.TextValidator(wx.FILTER_INCLUDE_CHAR_LIST)
+            validator.SetCharIncludes('0123456789.')
+            self.field = wx.TextCtrl(parent, size=(60,20), style=wx.TE_PROCESS_ENTER,
+                                     validator=validator)
             self.field.name = self.label.GetLabelText()  # type: ignore
             self.field.SetFont(font)
             self.Add(self.field, 1)
@@ -100,11 +112,6 @@ class ControlBox(wx.StaticBox):
                     self.input[label], 0, 
                     wx.EXPAND | wx.BOTTOM | wx.LEFT | wx.RIGHT, 15
                 )
-
-                # Bind events
-                self.input[label].Bind(
-                    wx.EVT_COMBOBOX, self.GetParent().onSelect
-                )
             elif input_type == 'text':
                 # Create a text input
                 _label = f"{label.replace('__', '-').replace('_', ' ')}"
@@ -113,11 +120,6 @@ class ControlBox(wx.StaticBox):
 
                 if 'value' in inputargs:
                     self.input[label].field.SetValue(inputargs['value'][label])
-
-                # Bind events
-                self.input[label].field.Bind(
-                    wx.EVT_CHAR, self.GetParent().acceptInput
-                )
             else:
                 raise ValueError("Invalid input type")
         self.SetMinSize((200, -1))
@@ -129,12 +131,10 @@ class GUIPanel(wx.Panel):
 
     Callbacks
     ---------
-    onSelect
+    onCancerSelect
         Populate GSE selector with GSEs for selected cancer type
     onAnalyze
         Perform differential gene expression analysis on selected dataset
-    acceptInput
-        Acceptable inputs for analysis thresholds
     
     Methods
     -------
@@ -142,8 +142,26 @@ class GUIPanel(wx.Panel):
         Create a figure canvas
     populate_dge_table
         Populate the DGE table with results
+    _compute
+        Run the analysis on a worker thread
+    _on_done
+        Display analysis results
+    _on_error
+        Report a failed analysis
+    _set_busy
+        Show a busy state while an analysis runs
+    _set_ready
+        Restore the ready state after an analysis
+    _cached
+        Look up a value in an LRU cache, computing it on a miss
     """
 
+    # Number of datasets and analyses kept in memory
+    CACHE_SIZE = 8
+
+    # Maximum number of genes listed in the DGE table
+    TABLE_ROWS = 500
+
     def __init__(self, parent):
         # Initialize the wx.Panel class
         super().__init__(parent)
@@ -152,11 +170,27 @@ class GUIPanel(wx.Panel):
         self.parent = parent
         self.db = parent.db
 
+        # Recently loaded datasets and analysis results
+        self._data_cache = OrderedDict()
+        self._analysis_cache = OrderedDict()
+        self._cluster_cache = OrderedDict()
+
+        # Busy cursor held while an analysis runs
+        self._wait = None
+
+        # Map each cancer type to its GSEs with a single query
+        self._gse_cache = dict()
+        datasets = self.db.select("SELECT CANCER, GSE FROM `datasets`")
+        for cancer, gse in zip(datasets['CANCER'], datasets['GSE']):
+            self._gse_cache.setdefault(cancer, []).append(gse)
+
+        # Order GSEs by their numeric accession once
+        for gses in self._gse_cache.values():
+            gses.sort(key=lambda x: int(x[3:]))
+
         # Get choices for selectors
         self.select_choices = {
-            'cancer_type': (self.db
-                .select("SELECT DISTINCT CANCER FROM `datasets`")['CANCER']
-                .tolist()),
+            'cancer_type': sorted(self._gse_cache),
             'gse': []
         }
 
@@ -174,6 +208,11 @@ class GUIPanel(wx.Panel):
             value={'cancer_type': '', 'gse': ''}
         )
 
+        # Update the GSE selector when a cancer type is chosen
+        self.dataset_box.input['cancer_type'].Bind(
+            wx.EVT_COMBOBOX, self.onCancerSelect
+        )
+
         # Add 'Analyze' button
         self.analyze = wx.Button(self, label="Analyze")
         self.analyze.Bind(wx.EVT_BUTTON, self.onAnalyze)
@@ -245,6 +284,7 @@ class GUIPanel(wx.Panel):
 
         fig = Figure()
         if figtype == 'heatmap':
+            from matplotlib import gridspec
             gs = gridspec.GridSpec(
                 2, 4, width_ratios=[0.1, 0.04, 1, 0.02], height_ratios=[0.25, 1],
                 wspace=0.02, hspace=0.02
@@ -279,97 +319,170 @@ class GUIPanel(wx.Panel):
         return dict(fig=fig, axis=axis, canvas=canvas)
 
 
-    def onSelect(self, event):
+    def onCancerSelect(self, event):
         """
         Populate GSE selector with GSEs for selected cancer type
         """
 
-        # Get the triggering control
-        obj = event.GetEventObject()
+        # Get GSEs for the selected cancer type
+        gses = self._gse_cache.get(event.GetString(), [])
 
-        if obj.name == 'cancer_type':
-            # Get GSEs for the selected cancer type
-            gse = self.db.select(
-                f"SELECT GSE FROM `datasets` WHERE CANCER = '{obj.GetValue()}'"
-            )
-
-            # Add options to GSE selector
-            self.dataset_box.input['gse'].Clear()
-            self.dataset_box.input['gse'].AppendItems(gse['GSE'].tolist())
-            self.dataset_box.input['gse'].SetValue(gse['GSE'].tolist()[0])
-        else:
-            event.Skip()
+        # Replace the GSE choices in one call and select the first one
+        self.dataset_box.input['gse'].Set(gses)
+        if gses:
+            self.dataset_box.input['gse'].SetValue(gses[0])
 
 
-    def acceptInput(self, event):
+    def onAnalyze(self, event):
         """
-        Acceptable inputs for analysis thresholds
+        Handle button click
         """
 
-        key = event.GetKeyCode()
-
-        # Allow ASCII numerals
-        if ord('0') <= key <= ord('9'):
-            event.Skip()
+        # Get values from text inputs
+        cancer_type = self.dataset_box.input['cancer_type'].GetValue()
+        gse = self.dataset_box.input['gse'].GetValue()
+        dataset = (gse, cancer_type)
+        try:
+            p_thr = float(self.threshold_box.input['p__value'].field.GetValue())
+            fc_thr = float(self.threshold_box.input['fold_change'].field.GetValue())
+        except ValueError:
+            wx.MessageBox('Please enter numeric thresholds', 'Error')
             return
+        self.p_thr, self.fc_thr = p_thr, fc_thr
 
-        # Allow decimal point
-        if key == ord('.'):
-            event.Skip()
+        # Prompt if no dataset is selected
+        if cancer_type == '' or gse == '':
+            wx.MessageBox('Please select a dataset to analyze', 'Error')
             return
 
-        # Allow backspace, arrow keys, home, end, delete
-        if key in [wx.WXK_BACK, wx.WXK_LEFT, wx.WXK_RIGHT, wx.WXK_HOME,
-                   wx.WXK_END, wx.WXK_DELETE]:
-            event.Skip()
+        # Set wait state
+        self._set_busy("Analyzing %s..." % gse)
+
+        try:
+            # Retreive data from database (reusing recently loaded datasets)
+            self.data = self._cached(
+                self._data_cache, dataset,
+                lambda: self.db.retrieve_dataset(dataset)
+            )
+
+            # Check for results saved in a previous session
+            key = (*dataset, self.p_thr, self.fc_thr)
+            if key not in self._analysis_cache:
+                stored = self.db.load_dge(key)
+                if stored is not None:
+                    self._cached(self._analysis_cache, key, lambda: stored)
+        except Exception as e:
+            self._on_error(e)
             return
 
-        return
+        # Run analysis off the GUI thread
+        threading.Thread(
+            target=self._compute, args=(key, self.data), daemon=True
+        ).start()
 
 
-    def onAnalyze(self, event):
+    def _compute(self, key, data):
         """
-        Handle button click
+        Run the analysis on a worker thread and hand results to the GUI
         """
 
-        # Get values from text inputs
-        cancer_type = self.dataset_box.input['cancer_type'].GetValue()
-        gse = self.dataset_box.input['gse'].GetValue()
-        dataset = (gse, cancer_type)
-        self.p_thr = float(self.threshold_box.input['p__value'].field.GetValue())
-        self.fc_thr = float(self.threshold_box.input['fold_change'].field.GetValue())
-
-        # Set wait state
-        self.parent.SetStatusText("Analyzing %s..." % gse)
-        self.analyze.Disable()
-        wait = wx.BusyCursor()
+        try:
+            from dge import dge
 
-        # Prompt if no dataset is selected
-        if cancer_type == '' or gse == '':
-            wx.MessageBox('Please select a dataset to analyze', 'Error')
-            self.analyze.Enable()
+            # Run analysis (reusing results for the same thresholds)
+            computed = key not in self._analysis_cache
+            results = self._cached(
+                self._analysis_cache, key,
+                lambda: dge(data, self.fc_thr, self.p_thr)
+            )
+        except Exception as e:
+            wx.CallAfter(self._on_error, e)
             return
+        wx.CallAfter(self._on_done, key, results, computed)
+
 
-        # Retreive data from database
-        self.data = self.db.retrieve_dataset(dataset)
+    def _on_done(self, key, results, computed):
+        """
+        Display analysis results once the worker thread is finished
+        """
 
-        # Run analysis
-        self.dge = dge(self.data, self.fc_thr, self.p_thr)
+        from dge import plot_volcano, plot_heatmap
 
-        # Populate DGE table
-        self.populate_dge_table()
+        self.dge = results
 
-        # Volcano Plot
-        plot_volcano(self.volcano['axis'], self.dge, self.fc_thr, self.p_thr)
-        self.volcano['canvas'].draw()  # type: ignore
+        try:
+            # Save new results to the database
+            if computed:
+                self.db.store_dge(key, results)
 
-        # Heatmap
-        plot_heatmap(self.heatmap['fig'], self.heatmap['axis'], self.data)
-        self.heatmap['canvas'].draw()  # type: ignore
+            # Populate DGE table
+            self.populate_dge_table()
+
+            # Volcano Plot
+            plot_volcano(self.volcano['axis'], self.dge, self.fc_thr, self.p_thr)
+            self.volcano['canvas'].draw_idle()  # type: ignore
+
+            # Heatmap
+            plot_heatmap(
+                self.heatmap['fig'], self.heatmap['axis'], self.data,
+                self._cached(self._cluster_cache, key[:2], dict)
+            )
+            self.heatmap['canvas'].draw_idle()  # type: ignore
+        except Exception as e:
+            self._on_error(e)
+            return
 
         # Reset wait state
+        self._set_ready()
+
+
+    def _on_error(self, error):
+        """
+        Restore the ready state and report an analysis that failed
+        """
+
+        self._set_ready()
+        wx.MessageBox(f'Analysis failed: {error}', 'Error',
+                      wx.OK | wx.ICON_ERROR)
+
+
+    def _set_busy(self, msg):
+        """
+        Disable analysis and show a busy status while results are computed
+        """
+
+        self.parent.Freeze()
+        self.analyze.Disable()
+        self.parent.SetStatusText(msg)
+        self.parent.Thaw()
+        self._wait = wx.BusyCursor()
+
+
+    def _set_ready(self):
+        """
+        Re-enable analysis once results are displayed
+        """
+
+        self.parent.Freeze()
         self.parent.SetStatusText("Ready")
         self.analyze.Enable()
+        self.parent.Thaw()
+        self._wait = None  # Releases the busy cursor
+
+
+    def _cached(self, cache, key, compute):
+        """
+        Look up `key` in an LRU cache, computing and storing it on a miss
+        """
+
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        cache[key] = compute()
+        if len(cache) > self.CACHE_SIZE:
+            cache.popitem(last=False)
+        return cache[key]
 
 
     def populate_dge_table(self):
@@ -381,23 +494,28 @@ class GUIPanel(wx.Panel):
         self.dge_table.DeleteAllItems()
 
         # Keep only significant genes
-        dge = (self.dge[self.dge['adj pval'] < self.p_thr]
-            .sort_values(['fc', 'adj pval'], ascending=[False, True]))
-        dge['fc'] = dge['fc'].apply(lambda x: f"{x:.2f}")
-        dge['adj pval'] = dge['adj pval'].apply(lambda x: f"{x:.2e}")
+        dge = self.dge[self.dge['adj pval'].to_numpy() < self.p_thr]
+
+        # Only sort the genes that will be displayed
+        if len(dge) > self.TABLE_ROWS:
+            top = np.argpartition(-dge['fc'].to_numpy(), self.TABLE_ROWS)
+            dge = dge.iloc[top[:self.TABLE_ROWS]]
+        dge = dge.sort_values(['fc', 'adj pval'], ascending=[False, True])
+        genes = dge['gene'].to_numpy()
+        fcs = np.char.mod('%.2f', dge['fc'].to_numpy(dtype=np.float64))
+        pvals = [f"{x:.2e}" for x in dge['adj pval'].to_numpy()]
 
         # If no DGEs, display message
         if dge.shape[0] == 0:
             wx.MessageBox('No DGEs found', 'No DGEs')
 
         # Add rows
-        for i in range(len(dge)):
-            fc = dge.iloc[i]['fc']
-            p = dge.iloc[i]['adj pval']
-
-            self.dge_table.InsertItem(i, dge.iloc[i]['gene'])
-            self.dge_table.SetItem(i, 1, fc)
+        self.dge_table.Freeze()
+        for i, (gene, fc, p) in enumerate(zip(genes, fcs, pvals)):
+            self.dge_table.InsertItem(i, gene)
+            self.dge_table.SetItem(i, 1, str(fc))
             self.dge_table.SetItem(i, 2, p)
+        self.dge_table.Thaw()
 
 
 class CaBiD_GUI(wx.Frame):
@@ -408,6 +526,10 @@ class CaBiD_GUI(wx.Frame):
     -------
     create_menu
         Create the menu bar for the GUI
+    _post_init
+        Connect to the database and create the panel after the window is shown
+    _warmup
+        Pre-load the analysis libraries in the background
 
     Callbacks
     ---------
@@ -431,6 +553,28 @@ class CaBiD_GUI(wx.Frame):
             *args, **kwargs
         )
         
+        # Load analysis and plotting libraries in the background
+        threading.Thread(target=self._warmup, daemon=True).start()
+
+        # Create menus; the database and panel are set up once the window
+        # is shown
+        self.db, self.panel = None, None
+        self.create_menu()
+        self.CreateStatusBar()
+        self.SetStatusText("Loading CaBiD...")
+        wx.CallAfter(self._post_init)
+
+        # Bind event for closing the window
+        self.Bind(wx.EVT_CLOSE, self.onExit)
+
+
+    def _post_init(self):
+        """
+        Connect to the database and create the main panel
+        """
+
+        wait = wx.BusyCursor()
+
         # Check if database exists
         datacheck();
 
@@ -438,14 +582,21 @@ class CaBiD_GUI(wx.Frame):
         dbpath = datadir() / 'CaBiD.db'
         self.db = CaBiD_db(dbpath)
 
-        # Create panel and menus
+        # Create panel
         self.panel = GUIPanel(self)
-        self.create_menu()
-        self.CreateStatusBar()
+        self.SendSizeEvent()
         self.SetStatusText("Welcome to CaBiD!")
+        del wait
 
-        # Bind event for closing the window
-        self.Bind(wx.EVT_CLOSE, self.onExit)
+
+    @staticmethod
+    def _warmup():
+        """
+        Import the analysis module and pre-load its libraries
+        """
+
+        from dge import warmup
+        warmup()
 
 
     def create_menu(self):
@@ -506,10 +657,10 @@ class CaBiD_GUI(wx.Frame):
         self.SetStatusText("Saving results to %s..." % path)
         (self.panel.dge
             .to_csv(path / f"{dataset}_DGE.csv", index=False))  # type: ignore
-        (self.panel.volcano['fig']
-            .savefig(path / f"{dataset}_volcano.png"))  # type: ignore
-        (self.panel.heatmap['fig']
-            .savefig(path / f"{dataset}_heatmap.png"))  # type: ignore
+        (self.panel.volcano['canvas']
+            .print_png(str(path / f"{dataset}_volcano.png")))  # type: ignore
+        (self.panel.heatmap['canvas']
+            .print_png(str(path / f"{dataset}_heatmap.png")))  # type: ignore
         self.SetStatusText("Ready")
 
         # Show dialog
@@ -528,7 +679,7 @@ class CaBiD_GUI(wx.Frame):
     def onExit(self, event):
         """Close the window"""
 
-        self.db.close()
+        if self.db is not None:  self.db.close()
         self.Destroy()
 
     
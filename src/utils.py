@@ -20,23 +20,45 @@ slugify
     Convert a URL to a clean filename (Based on Django's slugify)
 isnonemptyfile
     Check if a file exists and is not empty
+httpsession
+    Get the shared HTTP session used for downloads
+atomicpath
+    Write a file through a temporary path that is renamed into place
 datadir
     Return the path to project data directory
 downloadurl
     Download a URL to a file
+downloadurls
+    Download several URLs concurrently
 CaBiD_db
     Class for connecting to and querying the CaBiD database
 """
 
 # Imports
-from typing import Any, Tuple
-from pandas import DataFrame
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, List, Tuple
+from contextlib import contextmanager
+from functools import cache, lru_cache
+from pandas import DataFrame, Index, read_parquet
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tqdm.auto import tqdm
 from pathlib import Path
 from rich import print
 
-import os, pickle, platform, re, requests, shutil, sqlite3, tempfile, \
-    unicodedata
+import pyarrow as pa
+import numpy as np
+import hashlib, io, json, os, platform, re, requests, shutil, sqlite3, stat, \
+    tempfile, unicodedata
+
+
+# Precompiled patterns for slugify and downloadurl
+_SLUG_STRIP = re.compile(r'[^\w.\s-]')
+_SLUG_DASH = re.compile(r'[-\s]+')
+_URL_SCHEME = re.compile(r'(?:https?|ftp)://')
+
+# Block size used when streaming downloads to disk
+DOWNLOAD_CHUNK_SIZE = 1 << 20
 
 
 class config:
@@ -46,7 +68,8 @@ class config:
     Attributes
     ----------
     CACHEDIR : str
-        Directory for storing cached data (pickle files)
+        Directory for storing cached data (parsed GEO tables as Parquet with
+        JSON metadata, and GPL annotation tables as Feather files)
     DATADIR : str
         Directory for storing downloaded data
     TEMPDIR : str
@@ -58,16 +81,33 @@ class config:
     TEMPDIR = tempfile.gettempdir() + '/CaBiD'
 
 
+@cache
 def ispc() -> bool:
     """
     Check if the system is a PC
     Based on bmes.ispc() by Ahmet Sacan
     """
 
-    if not hasattr(ispc, 'value'):
-        system = platform.system()
-        ispc.value = system == 'Windows' or system.startswith('CYGWIN')
-    return ispc.value
+    system = platform.system()
+    return system == 'Windows' or system.startswith('CYGWIN')
+
+
+@cache
+def _resolvedir(path: str) -> Path:
+    """Resolve a directory path (once per path)"""
+    return Path(path).resolve()
+
+
+def _makedir(path: str) -> Path:
+    """
+    Return the resolved path of a directory, (re)creating it if it is
+    missing (e.g. after the temporary directory was cleaned up)
+    """
+
+    resolved = _resolvedir(path)
+    if not resolved.is_dir():
+        os.makedirs(resolved, exist_ok=True)
+    return resolved
 
 
 def cachedir() -> Path:
@@ -82,17 +122,10 @@ def cachedir() -> Path:
 
     # Check if temporary directory is set
     if config.CACHEDIR is not None:
-        if not os.path.exists(config.CACHEDIR):
-            os.makedirs(config.CACHEDIR)
-
-        return Path(config.CACHEDIR).resolve()
+        return _makedir(config.CACHEDIR)
 
     # Create a temporary directory
-    path = (Path(tempfile.gettempdir()) / 'CaBiD/cache').resolve()
-    if not os.path.exists(path):
-        os.makedirs(path)
-
-    return path
+    return _makedir(os.path.join(tempfile.gettempdir(), 'CaBiD', 'cache'))
 
 
 def tempdir() -> Path:
@@ -107,19 +140,13 @@ def tempdir() -> Path:
 
     # Check if temporary directory is set
     if config.TEMPDIR is not None:
-        if not os.path.exists(config.TEMPDIR):
-            os.makedirs(config.TEMPDIR)
-
-        return Path(config.TEMPDIR).resolve()
+        return _makedir(config.TEMPDIR)
 
     # Create a temporary directory
-    path = (Path(tempfile.gettempdir()) / 'CaBiD').resolve()
-    if not os.path.exists(path):
-        os.makedirs(path)
-
-    return path
+    return _makedir(os.path.join(tempfile.gettempdir(), 'CaBiD'))
 
 
+@lru_cache(maxsize=1024)
 def slugify(value: str, allow_unicode: bool=False) -> str:
     """
     Taken from https://github.com/django/django/blob/master/django/utils/text.py
@@ -134,16 +161,18 @@ def slugify(value: str, allow_unicode: bool=False) -> str:
     assert isinstance(allow_unicode, bool), 'allow_unicode must be a boolean'
 
     value = str(value)
-    if allow_unicode:
+    if value.isascii():
+        pass  # ASCII is unchanged by normalization
+    elif allow_unicode:
         value = unicodedata.normalize('NFKC', value)
     else:
         value = (unicodedata.normalize('NFKD', value)
             .encode('ascii', 'ignore')
             .decode('ascii'))
     
-    value = re.sub(r'[^\w.\s-]', '', value).strip().lower()
+    value = _SLUG_STRIP.sub('', value).strip().lower()
 
-    return re.sub(r'[-\s]+', '-', value)
+    return _SLUG_DASH.sub('-', value)
 
 
 def isnonemptyfile(file: str) -> bool:
@@ -154,7 +183,61 @@ def isnonemptyfile(file: str) -> bool:
     assert isinstance(file, str) or isinstance(file, Path), \
         'file must be a string'
 
-    return os.path.isfile(file) and os.path.getsize(file) > 0
+    # A single stat call covers both checks
+    try:
+        st = os.stat(file)
+    except OSError:
+        return False
+    return stat.S_ISREG(st.st_mode) and st.st_size > 0
+
+
+@contextmanager
+def atomicpath(file: str | Path) -> Iterator[Path]:
+    """
+    Yield a temporary path next to `file` and move it into place once the
+    block completes, so readers never see a partially written file.
+
+    Parameters
+    ----------
+    file : str | Path
+        Final path of the file
+
+    Yields
+    ------
+    Path
+        Temporary path to write to
+    """
+
+    file = Path(file)
+    tmp = file.with_name(f'.{file.name}.{os.getpid()}.tmp')
+    try:
+        yield tmp
+        os.replace(tmp, file)
+    finally:
+        if tmp.exists():  tmp.unlink()
+
+
+@cache
+def httpsession() -> requests.Session:
+    """
+    Get the HTTP session shared by all downloads, so connections (and TLS
+    sessions) to GEO and CuMiDa are pooled and failed requests are retried.
+
+    Returns
+    -------
+    requests.Session
+        Session with a retrying connection pool mounted for http and https
+    """
+
+    session = requests.Session()
+    retry = Retry(total=5, backoff_factor=0.5,
+                  status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16,
+                          max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
 
 
 def datadir() -> Path:
@@ -165,32 +248,52 @@ def datadir() -> Path:
 
     # Check if data directory is set
     if config.DATADIR is not None:
-        if not os.path.exists(config.DATADIR):
-            os.makedirs(config.DATADIR)
+        return _makedir(config.DATADIR)
 
-        return Path(config.DATADIR).resolve()
+    if ispc():
+        return _makedir(os.path.join(os.environ['USERPROFILE'], 'CaBiD'))
+    return _makedir(os.path.join(os.environ['HOME'], '.cabid'))
 
-    # Store path as an attribute
-    if not hasattr(datadir, 'path'):
-        datadir.path = ''
-    path = datadir.path
 
-    if not path:
-        if ispc():
-            path = Path(os.environ['USERPROFILE']) / 'CaBiD'
-        else:
-            path = Path(os.environ['HOME']) / '.cabid'
-        
-        if not os.path.exists(path):
-            os.makedirs(path)
+def _sha256(file: Path) -> 'hashlib._Hash':
+    """Hash an existing file in DOWNLOAD_CHUNK_SIZE blocks"""
+
+    digest = hashlib.sha256()
+    with open(file, 'rb', buffering=0) as f:
+        while block := f.read(DOWNLOAD_CHUNK_SIZE):
+            digest.update(block)
+    return digest
 
-        datadir.path = path
 
-    return path
+class _HashWriter:
+    """File wrapper that hashes everything written through it"""
+
+    __slots__ = ('file', 'digest')
+
+    def __init__(self, file, digest) -> None:
+        self.file, self.digest = file, digest
+
+    def write(self, block: bytes) -> int:
+        self.digest.update(block)
+        return self.file.write(block)
+
+
+def _intact(file: Path, meta: dict) -> bool:
+    """
+    Check a downloaded file against the checksum saved with it. The file is
+    only re-hashed if its size or mtime changed since it was downloaded.
+    """
+
+    if 'sha256' not in meta:  return True
+    st = os.stat(file)
+    if st.st_size != meta['size']:  return False
+    if st.st_mtime_ns == meta['mtime_ns']:  return True
+    return _sha256(file).hexdigest() == meta['sha256']
 
 
 def downloadurl(url: str, file: str='', overwrite: bool=False,
-                progress: bool=True) -> str:
+                progress: bool=True,
+                session: requests.Session | None=None) -> str:
     """
     Download and save file from a given URL
     Modified from bmes.downloadurl by Ahmet Sacan
@@ -203,9 +306,13 @@ def downloadurl(url: str, file: str='', overwrite: bool=False,
         Path to file (or directory) where download will be stored,
         by default ''
     overwrite : bool, optional
-        Should existing files be overwritten, by default False
+        Should existing files be overwritten, by default False. Files
+        whose ETag/Last-Modified were saved are only re-downloaded if the
+        server reports that they changed
     progress : bool, optional
         Should a progress bar be displayed, by default True
+    session : requests.Session, optional
+        Session to reuse connections from, by default `httpsession()`
 
     Returns
     -------
@@ -219,13 +326,14 @@ def downloadurl(url: str, file: str='', overwrite: bool=False,
     assert isinstance(overwrite, bool), 'overwrite must be a boolean'
 
     # If URL is not a remote address, assume it is a local file
-    if not re.search(r'^(http[s]?|ftp):\/\/', url):
+    if not _URL_SCHEME.match(url):
         if not file:
             return url
-        if not overwrite:
-            if isnonemptyfile(file):  return file
-            shutil.copyfile(url, file)
-            return file
+        if isnonemptyfile(file) and not overwrite:  return file
+
+        ## copyfile copies in the kernel (sendfile/fcopyfile) where it can
+        shutil.copyfile(url, file)
+        return file
 
     # Get file name from URL and append to file path
     if not file:
@@ -236,44 +344,143 @@ def downloadurl(url: str, file: str='', overwrite: bool=False,
     else:
         file = Path(file).resolve()  # type: ignore
 
-    # Return file if it exists and overwrite is False
-    if isnonemptyfile(file) and not overwrite:  return file
+    # Return file if it exists (and still matches its checksum)
+    metafile = file.with_name(file.name + '.meta.json')  # type: ignore
+    meta = dict()
+    if metafile.is_file():
+        with open(metafile) as f:  meta = json.load(f)
+    intact = isnonemptyfile(file) and _intact(file, meta)  # type: ignore
+    if intact and not overwrite:  return file
+
+    # Downloads are written to a .part file that is renamed once complete
+    session = session or httpsession()
+    part = file.with_name(file.name + '.part')  # type: ignore
+    validator = meta.get('etag') or meta.get('last-modified')
+
+    headers = dict()
+    offset = part.stat().st_size if part.is_file() else 0
+    if offset:
+        ## Resume an interrupted download (unless the remote file changed)
+        headers['Range'] = f'bytes={offset}-'
+        if validator:  headers['If-Range'] = validator
+        ## Byte ranges only line up with the file on disk if uncompressed
+        headers['Accept-Encoding'] = 'identity'
+    elif intact:
+        ## Only re-download if the remote file changed since the last download
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last-modified'):
+            headers['If-Modified-Since'] = meta['last-modified']
 
     # Download the file
-    r = requests.get(url, stream=True, allow_redirects=True,
-                     timeout=(3, 27))
-    if r.status_code == 200:
-        size = int(r.headers.get('content-length', 0))
-        
-        # Create a progress bar
-        if progress:
-            with open(file, 'wb') as f:
-                with tqdm(
-                    total=size, 
-                    unit='B', 
-                    unit_scale=True, 
-                    desc=file.name,  # type: ignore
-                    initial=0
-                ) as pbar:
-                    for chunk in r.iter_content(chunk_size=1024):
-                        if chunk:
-                            f.write(chunk)
-                            pbar.update(len(chunk))
-        else:
-            with open(file, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=1024):
-                    if chunk:
-                        f.write(chunk)
-
+    r = session.get(url, stream=True, allow_redirects=True,
+                    timeout=(3, 27), headers=headers)
+    if r.status_code == 304:
+        r.close()
+        return file
+    elif r.status_code == 416:
+        ## The partial file doesn't match the remote one, start over
+        r.close()
+        part.unlink()
+        return downloadurl(url, str(file), overwrite, progress, session)
     elif r.status_code == 404:
         raise Exception('URL not found')
-    else:
+    elif r.status_code not in (200, 206):
         raise Exception('Unexpected error, status code: ' +
                         str(r.status_code))
 
+    # A full response replaces the partial file and its validators
+    if r.status_code == 200:
+        offset = 0
+        meta = {
+            k: r.headers[k] for k in ('etag', 'last-modified')
+            if k in r.headers
+        }
+        with open(metafile, 'w') as f:  json.dump(meta, f)
+    # Compressed responses (the session accepts gzip/deflate by default, and
+    # br if brotli is installed) are decoded on the fly, so Content-Length
+    # is not the size of the file on disk
+    size = 0
+    if 'content-length' in r.headers and 'content-encoding' not in r.headers:
+        size = offset + int(r.headers['content-length'])
+
+    # Hash the file while it is written (resumed files hash the part first)
+    digest = _sha256(part) if offset else hashlib.sha256()
+
+    # Stream the raw response straight to disk in large blocks (blocks larger
+    # than the file buffer are passed to the OS without an extra copy)
+    r.raw.decode_content = True
+    with open(part, 'ab' if offset else 'wb') as fh:
+        f = _HashWriter(fh, digest)
+        if progress:
+            with tqdm.wrapattr(
+                r.raw, 'read',
+                total=size or None,
+                initial=offset,
+                mininterval=0.5,
+                desc=file.name,  # type: ignore
+            ) as raw:
+                shutil.copyfileobj(raw, f, length=DOWNLOAD_CHUNK_SIZE)
+        else:
+            shutil.copyfileobj(r.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+
+    # Keep incomplete downloads as .part files so they can be resumed
+    if size and part.stat().st_size != size:
+        raise Exception(f'Incomplete download: {url}')
+    os.replace(part, file)
+
+    # Save the checksum so later cache hits can be verified cheaply
+    st = os.stat(file)
+    meta.update(sha256=digest.hexdigest(), size=st.st_size,
+                mtime_ns=st.st_mtime_ns)
+    with open(metafile, 'w') as f:  json.dump(meta, f)
+
     return file
 
 
+def downloadurls(urls: List[str], files: List[str] | None=None,
+                 overwrite: bool=False, max_workers: int=8) -> List[str]:
+    """
+    Download several URLs concurrently over the shared HTTP session
+
+    Parameters
+    ----------
+    urls : List[str]
+        URLs to retreive files from
+    files : List[str], optional
+        Paths (or directories) to store each download in, by default
+        each file is saved to the temporary directory
+    overwrite : bool, optional
+        Should existing files be overwritten, by default False
+    max_workers : int, optional
+        Maximum number of simultaneous downloads, by default 8
+
+    Returns
+    -------
+    List[str]
+        Paths to the downloaded files, in the same order as `urls`
+    """
+
+    # Check inputs
+    if files is None:  files = [''] * len(urls)
+    assert len(files) == len(urls), 'files and urls must be the same length'
+
+    # Downloads are I/O bound, so threads overlap the network waits
+    session = httpsession()
+    with ThreadPoolExecutor(max_workers=max_workers) as ex, \
+         tqdm(total=len(urls), desc='Downloading') as pbar:
+        futures = [
+            ex.submit(downloadurl, url, file, overwrite, False, session)
+            for url, file in zip(urls, files)
+        ]
+        paths = []
+        for future in futures:
+            paths.append(future.result())
+            pbar.update(1)
+
+    return paths
+
+
 class CaBiD_db:
     """
     This class provides access to the CaBiD database and provides special
@@ -281,18 +488,24 @@ class CaBiD_db:
 
     Methods
     -------
-    execute(query: str, params: tuple=(), commit: bool=False)
+    execute(query: str, params: tuple=(), commit: bool=True)
         Execute a query
     select(query: str, params: tuple=())
         Execute a select query
     retrieve_dataset(dataset: tuple)
         Retrieve a dataset from the database
+    load_dge(key: tuple)
+        Load cached DGE results for a dataset and thresholds
+    store_dge(key: tuple, dge: DataFrame)
+        Cache DGE results for a dataset and thresholds
     check_table(table: str)
         Check if a table exists in the database
     drop_table(table: str)
         Drop a table from the database
     binarize(obj: Any)
-        Convert an object to a binary string (pickle)
+        Convert an array to a binary string (zstd-compressed float32 bytes)
+    debinarize(blob: bytes, shape: tuple)
+        Convert a binary string created by binarize back into an array
     close()
         Close the database connection
     """
@@ -314,8 +527,18 @@ class CaBiD_db:
         self.conn = sqlite3.connect(file)
         self.conn.row_factory = sqlite3.Row  # Fetchall returns dict
 
+        # Use write-ahead logging to reduce fsyncs on commit
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+
+        # Memory-map the database and keep a larger page cache for blob reads
+        self.conn.execute('PRAGMA mmap_size=268435456')
+        self.conn.execute('PRAGMA cache_size=-200000')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+
 
-    def execute(self, query: str, params: Tuple[Any, ...]=()) -> None:
+    def execute(self, query: str, params: Tuple[Any, ...]=(),
+                commit: bool=True) -> None:
         """
         Execute a query
 
@@ -325,18 +548,20 @@ class CaBiD_db:
             Query to execute
         params : Tuple[Any, ...], optional
             Parameters to pass to query, by default ()
+        commit : bool, optional
+            Whether to commit after the query, by default True
         """
 
         # Check inputs
         assert isinstance(query, str), 'query must be a string'
         assert isinstance(params, tuple), 'params must be a tuple'
 
-        if query.lower().startswith('select'):
+        if query.lstrip()[:6].lower() == 'select':
             raise Exception('Use select method for select queries')
         else:
             try:
                 self.conn.execute(query, params)
-                self.conn.commit()
+                if commit:  self.conn.commit()
             except sqlite3.Error as e:
                 print(e)
 
@@ -373,16 +598,16 @@ class CaBiD_db:
         if len(rows) == 0:
             raise Exception('No results found')
         else:
-            df = DataFrame(rows)
-            df.columns = [x[0] for x in cursor.description]  # type: ignore
-            return df
+            return DataFrame.from_records(
+                rows, columns=[x[0] for x in cursor.description]
+            )
 
 
     def retrieve_dataset(self, dataset: tuple) -> DataFrame:
         """
         This method will retrieve a gene expression dataset from the CaBiD
-        database. It will then convert the gene expresssion data (stored in
-        binary format as pickle objects) into a pandas DataFrame with the 
+        database. It will then convert the gene expresssion data (stored as
+        compressed float32 bytes) into a pandas DataFrame with the 
         sample type (cancer or normal) as the index and the gene IDs as the
         columns.
 
@@ -401,25 +626,83 @@ class CaBiD_db:
         assert len(dataset) == 2, 'dataset must be a tuple of length 2'
         assert dataset[0].startswith('GSE'), 'dataset[0] must be a GSE ID'
 
-        # Query the database
-        data = self.select((
-            "SELECT E.* FROM `expression` AS E, `datasets` AS D "
-            "WHERE D.GSE = '%s' AND D.CANCER = '%s' AND E.DATASET_ID = D.ID"
-        ) % dataset)
+        # Query the database (a single row, read without building a DataFrame)
+        row = self.conn.execute((
+            "SELECT D.GENES, E.N_SAMPLES, E.N_GENES, E.SAMPLE_TYPES, E.MATRIX "
+            "FROM `expression` AS E, `datasets` AS D "
+            "WHERE D.GSE = ? AND D.CANCER = ? AND E.DATASET_ID = D.ID"
+        ), dataset).fetchone()
+        if row is None:
+            raise Exception('Dataset not found in CaBiD database')
 
         # Convert the binary data to a DataFrame
         try:
-            data = (data['EXPRESSION']
-                .apply(lambda x: pickle.loads(x))
-                .set_index(data['SAMPLE_TYPE']))
-        except KeyError:
-            raise Exception('Dataset not found in CaBiD database')
+            X = self.debinarize(
+                row['MATRIX'], (row['N_SAMPLES'], row['N_GENES'])
+            )
+            data = DataFrame(
+                X, 
+                index=Index(row['SAMPLE_TYPES'].split('\t'), name='SAMPLE_TYPE'),
+                columns=row['GENES'].split('\t')
+            )
         except Exception as e:
             raise Exception('Error converting data to DataFrame: ' + str(e))
 
         return data
 
 
+    def load_dge(self, key: tuple) -> DataFrame | None:
+        """
+        Load cached DGE results
+
+        Parameters
+        ----------
+        key : tuple
+            Tuple of the form (gse, cancer_type, p_thr, fc_thr)
+
+        Returns
+        -------
+        DataFrame | None
+            Cached results, or None if the analysis hasn't been cached
+        """
+
+        # Check inputs
+        assert isinstance(key, tuple), 'key must be a tuple'
+        assert len(key) == 4, 'key must be a tuple of length 4'
+
+        row = self.conn.execute(
+            "SELECT `RESULTS` FROM `dge_cache` WHERE `GSE` = ? AND "
+            "`CANCER` = ? AND `P_THR` = ? AND `FC_THR` = ?", key
+        ).fetchone()
+
+        if row is None:  return None
+        return read_parquet(io.BytesIO(row['RESULTS']))
+
+
+    def store_dge(self, key: tuple, dge: DataFrame) -> None:
+        """
+        Cache DGE results
+
+        Parameters
+        ----------
+        key : tuple
+            Tuple of the form (gse, cancer_type, p_thr, fc_thr)
+        dge : DataFrame
+            Results of the analysis
+        """
+
+        # Check inputs
+        assert isinstance(key, tuple), 'key must be a tuple'
+        assert len(key) == 4, 'key must be a tuple of length 4'
+
+        buffer = io.BytesIO()
+        dge.to_parquet(buffer, compression='zstd')
+        self.execute(
+            "INSERT OR REPLACE INTO `dge_cache` VALUES (?, ?, ?, ?, ?)",
+            (*key, sqlite3.Binary(buffer.getvalue()))
+        )
+
+
     def check_table(self, table: str) -> bool:
         """
         Check if a table exists in the database.
@@ -437,16 +720,17 @@ class CaBiD_db:
 
         # Check if the table exists and is not empty
         try:
-            self.select((
-                "SELECT tbl_name FROM sqlite_master "
-                f"WHERE type='table' AND tbl_name='{table}'"
-            ))
-            self.select(f"SELECT * FROM {table} LIMIT 1")
-        except:
+            if self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                (table,)
+            ).fetchone() is None:
+                return False
+            return self.conn.execute(
+                f"SELECT EXISTS (SELECT 1 FROM `{table}`)"
+            ).fetchone()[0] == 1
+        except sqlite3.Error:
             return False
 
-        return True
-
     
     def drop_table(self, table: str) -> None:
         """
@@ -466,20 +750,46 @@ class CaBiD_db:
 
     def binarize(self, obj: Any) -> sqlite3.Binary:
         """
-        Convert an object to a pickled binary object
+        Convert an array of expression values to zstd-compressed
+        little-endian float32 bytes (row-major for matrices)
 
         Parameters
         ----------
         obj : Any
-            Object to convert
+            Array-like object to convert
         
         Returns
         -------
         sqlite3.Binary
-            Pickled binary object
+            Compressed float32 buffer
+        """
+
+        arr = np.ascontiguousarray(obj, dtype='<f4')
+        return sqlite3.Binary(
+            pa.compress(arr, codec='zstd', asbytes=True)  # type: ignore
+        )
+
+
+    def debinarize(self, blob: bytes, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Convert a buffer created by `binarize` back into an array
+
+        Parameters
+        ----------
+        blob : bytes
+            Compressed float32 buffer
+        shape : Tuple[int, ...]
+            Shape of the original array
+
+        Returns
+        -------
+        np.ndarray
+            Array of float32 values
         """
 
-        return sqlite3.Binary(pickle.dumps(obj, protocol=5))
+        size = int(np.prod(shape)) * 4
+        buf = pa.decompress(blob, decompressed_size=size, codec='zstd')
+        return np.frombuffer(buf, dtype='<f4').reshape(shape)
 
 
     def close(self) -> None: